@@ -1,12 +1,15 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import os, json
+import instrumentation
+
+# Stage timings for this script run (see the admin panel at the bottom).
+run_timer = instrumentation.RunTimer(track_memory=st.session_state.get("profile_memory", False))
 
 # =============================================================================
 # APP TITLE & SETTINGS
 # =============================================================================
+# The login prompt is drawn before pandas, plotly and openpyxl are imported, so a
+# cold start paints it right away; after the first run the imports are cached.
+run_timer.start("login")
 st.title("Cal Poly Pre-Award Workload Dashboard")
 
 # Password Protection
@@ -15,61 +18,40 @@ if password != "grants2025":
     st.error("Incorrect password. Please try again.")
     st.stop()
 
-# Editable lists at the top:
-omit_statuses = ['Award Received', 'Post-award Intake', 'Declined', 'Turned Away', 'Withdrawn']
-analysts_list = [
-    'Gartner, Susanne B',
-    'Alvord, Tyler',
-    'Dolengewicz, Julie F',
-    'Vazquez-Lozada, Anxo',
-    'Lijiam, Nazareth',
-    'Simon, Kathy'
-]
+run_timer.start("imports")
+import pandas as pd
+from datetime import datetime, timedelta
+import ingest
+import workload
+import business_days
+import workload_store
+import routing
+import charts
+import engine
+from settings import omit_statuses, name_mapping, calpoly_holidays, assignments
 
-# Create a mapping from full name to first name for display purposes.
-name_mapping = {full: full.split(',')[1].strip().split()[0] for full in analysts_list}
+# Settings are module-level, so they are built once per process, not per rerun.
+holidays = tuple(calpoly_holidays)
 
 # -----------------------------------------------------------------------------
-# Initialize custom workload storage in session state and load persisted data
+# Custom workload storage, shared by all sessions of this server process
 # -----------------------------------------------------------------------------
-if 'custom_workload' not in st.session_state:
-    st.session_state.custom_workload = {}
-
-filename = "custom_workload.json"
-if os.path.exists(filename):
-    with open(filename, "r") as f:
-        persistent_data = json.load(f)
-    for key_str, value in persistent_data.items():
-        # The key is stored as "Analyst|WeekStart" (e.g., "Tyler|2025-01-06")
-        analyst, week = key_str.split("|")
-        st.session_state.custom_workload[(analyst, week)] = value
+@st.cache_resource(show_spinner=False)
+def get_workload_store():
+    # SQLite in WAL mode; custom_workload.json is imported the first time.
+    return workload_store.CustomWorkloadStore()
 
-# -----------------------------------------------------------------------------
-# Define Cal Poly holidays for 2025-2026 (used for notification deadline calculation)
-# -----------------------------------------------------------------------------
-calpoly_holidays = [
-    datetime(2025, 1, 1).date(),    # New Year's Day
-    datetime(2025, 1, 20).date(),   # Martin Luther King, Jr., holiday
-    datetime(2025, 3, 31).date(),   # Cesar Chavez Day
-    datetime(2025, 5, 26).date(),   # Memorial Day
-    datetime(2025, 6, 19).date(),   # Juneteenth
-    datetime(2025, 7, 4).date(),    # Independence Day
-    datetime(2025, 9, 1).date(),    # Labor Day
-    datetime(2025, 11, 11).date(),  # Veterans’ Day
-    datetime(2025, 11, 27).date(),  # Thanksgiving Day
-    datetime(2025, 11, 28).date(),  # Lincoln’s Birthday observed
-    datetime(2025, 12, 25).date(),  # Christmas Day observed
-    datetime(2025, 12, 26).date(),  # Washington’s Birthday observed
-    datetime(2025, 12, 29).date(),  # California Admission Day observed
-    datetime(2025, 12, 30).date(),  # Indigenous Peoples’ Day observed
-    datetime(2025, 12, 31).date(),  # Campus closed (anticipated Governor/President holiday)
-    datetime(2026, 1, 1).date(),    # New Year's Day
-    datetime(2026, 1, 19).date()    # Martin Luther King, Jr., holiday
-]
+run_timer.start("custom workload load")
+custom_workload = get_workload_store()
+custom_workload.refresh()
+
+def get_custom_max(analyst, week):
+    return engine.custom_max(custom_workload, analyst, week)
 
 # =============================================================================
 # SECTION 1: CUSTOM WORKLOAD INPUT (Hidden by default in an expander)
 # =============================================================================
+run_timer.start("custom workload form")
 with st.expander("Set Custom Workload Level (Click to Expand)"):
     with st.form("workload_form"):
         selected_analyst = st.selectbox("Select your name:", list(name_mapping.values()))
@@ -81,53 +63,178 @@ with st.expander("Set Custom Workload Level (Click to Expand)"):
                                           help="Provide a brief explanation for the adjusted workload.")
         workload_submit = st.form_submit_button("Submit Workload Level")
         if workload_submit:
-            key = (selected_analyst, str(workload_week_start))
-            st.session_state.custom_workload[key] = {"percentage": workload_percent, "reasoning": workload_reasoning}
-            # Persist the custom workload info to a JSON file.
-            if os.path.exists(filename):
-                with open(filename, "r") as f:
-                    data = json.load(f)
-            else:
-                data = {}
-            data_key = f"{selected_analyst}|{workload_week_start}"
-            data[data_key] = {"percentage": workload_percent, "reasoning": workload_reasoning}
-            with open(filename, "w") as f:
-                json.dump(data, f)
+            # Persist the custom workload info (atomic per analyst/week upsert).
+            custom_workload.upsert(selected_analyst, workload_week_start, workload_percent, workload_reasoning)
             st.success(f"Set custom workload for {selected_analyst} for week starting {workload_week_start} to {workload_percent}% with reasoning: {workload_reasoning}")
 
+# -----------------------------------------------------------------------------
+# Cached ingest of uploaded workbooks (keyed on the content hash of the upload)
+# -----------------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_holiday_calendar(holidays):
+    return business_days.build_calendar(holidays)
+
+# Frames below are shared read-only (cache_resource, so hits are not copied) and
+# capped, so a long-running server only keeps the last few uploads in memory.
+@st.cache_resource(show_spinner="Reading workbook...", max_entries=8)
+def load_uploaded_export(digest, _files, omit_statuses, holidays):
+    df = ingest.load_exports(_files, omit_statuses, digest=digest)
+    # Runs once per new upload (a cache miss), so reruns and other sessions never
+    # move the shared "latest upload" pointer. The previous upload is kept for diffing.
+    previous = ingest.record_upload(digest, omit_statuses)
+    # 20-working-day notification date for every record, in one vectorized pass.
+    return business_days.add_notification_dates(df, get_holiday_calendar(holidays)), previous
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_workload_index(digest, _df, name_mapping, _previous=None):
+    # Built once per upload and shared read-only across reruns and sessions. When
+    # the previous upload's index is available, only the changed records are applied.
+    if _previous is not None:
+        previous_digest, previous_df, changes = _previous
+        counts, proposals = load_workload_index(previous_digest, previous_df, name_mapping)
+        removed = pd.concat([changes["removed"], changes["changed_before"]], ignore_index=True)
+        added = pd.concat([changes["added"], changes["changed_after"]], ignore_index=True)
+        return workload.update_workload_index(counts, proposals, removed, added, name_mapping)
+    return workload.build_workload_index(_df, name_mapping)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_previous_upload(digest, path):
+    try:
+        return ingest.read_snapshot(path)
+    except OSError:
+        # Pruned by a newer upload from another session before it was read.
+        return None
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def diff_uploads(previous_digest, digest, _previous_df, _df):
+    return ingest.diff_exports(_previous_df, _df)
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_week_chart(digest, workload_model, week, workload_version, _counts, _proposals):
+    final_data = charts.week_table(_counts, _proposals, week, get_custom_max)
+    reasoning = [(custom_workload.get(a, week) or {}).get("reasoning", "No reasoning provided")
+                 for a in final_data['PreAward Analyst']]
+    return final_data, charts.workload_figure(final_data, reasoning, xaxis_title=workload_models[workload_model][0])
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_heatmap_chart(digest, workload_model, week_starts, workload_version, _counts, _proposals):
+    return charts.heatmap_figure(_counts, _proposals, list(week_starts), get_custom_max,
+                                 title=workload_models[workload_model][1])
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_window_index(digest, _df, name_mapping, holidays):
+    # Preparation-window load: each proposal spread over the working days before its deadline.
+    return workload.build_window_index(_df, name_mapping, get_holiday_calendar(holidays))
+
+# Workload model -> (bar chart x-axis title, heatmap title)
+workload_models = {
+    "Deadline week": ("Number of Proposals", "Proposals per Analyst by Deadline Week"),
+    "Preparation window": ("Proposal Load (share of 20-working-day windows)", "Preparation Load per Analyst by Week")
+}
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_unassigned_queue(digest, _files, omit_statuses):
+    return ingest.load_unassigned(_files, omit_statuses)
+
+@st.cache_resource(show_spinner=False)
+def get_assignments():
+    # The assignments table is static, so its grouped display and the exact-match
+    # department -> (primary, backup) index are built once per process.
+    assignments_data = pd.DataFrame(assignments)
+    display_assignments_data = assignments_data.copy()
+    display_assignments_data["Departments Assigned"] = display_assignments_data["Departments Assigned"].map(routing.group_departments)
+    department_index = routing.build_department_index(assignments_data)
+    return (display_assignments_data.to_html(index=False, escape=False), department_index,
+            routing.department_table(department_index), sorted(department_index))
+
 # =============================================================================
 # SECTION 2: EXCEL UPLOAD, WORKLOAD GRAPH & DEADLINE/NOTIFICATION DATE
 # =============================================================================
+run_timer.start("excel ingest")
 st.header("Workload Overview")
-uploaded_file = st.file_uploader("Upload Excel File", type=["xlsx"])
-if uploaded_file:
+uploaded_files = st.file_uploader("Upload Excel File(s)", type=["xlsx"], accept_multiple_files=True,
+                                  help="Every sheet of every workbook is read. Upload the oldest export first: "
+                                       "for a Record Number found more than once, the copy from the last uploaded "
+                                       "file (then the last sheet and row) wins.")
+if uploaded_files:
     # --------------------------
     # Read and Clean Data
     # --------------------------
-    df = pd.read_excel(uploaded_file, engine="openpyxl")
-    df = df[~df['Record Status'].isin(omit_statuses)]
-    df = df.dropna(subset=['PreAward Analyst', 'Deadline Date'])
-    df['Deadline Date'] = pd.to_datetime(df['Deadline Date'], errors='coerce')
-    df = df.dropna(subset=['Deadline Date'])
-    # Calculate the week start for each deadline (Monday)
-    df['WeekStart'] = df['Deadline Date'] - pd.to_timedelta(df['Deadline Date'].dt.dayofweek, unit='d')
-    df['WeekStart_date'] = df['WeekStart'].dt.date
+    # The cleaned frame is cached by a hash of the upload bytes and persisted as a
+    # Parquet snapshot, so reruns and restarts skip parsing the workbook again.
+    # Multiple workbooks/sheets are deduplicated on Record Number in upload order,
+    # the same rule engine.py applies to its command-line order.
+    files = [f.getvalue() for f in uploaded_files]
+    upload_digest = ingest.upload_hash(files)
+    df, previous = load_uploaded_export(upload_digest, files, omit_statuses, holidays)
+
+    run_timer.start("upload diff and workload index")
+    # Diff against the previous upload (by Record Number) so only changed records
+    # are reprocessed, and tell the user what changed.
+    changes = None
+    if previous is not None:
+        previous_df = load_previous_upload(previous["digest"], previous["path"])
+        if previous_df is not None:
+            changes = diff_uploads(previous["digest"], upload_digest, previous_df, df)
+    if changes is not None:
+        workload_counts, workload_proposals = load_workload_index(upload_digest, df, name_mapping,
+                                                                  (previous["digest"], previous_df, changes))
+        changed_weeks = set()
+        for part in changes.values():
+            changed_weeks.update(part['WeekStart_date'])
+        st.info(f"Since the last upload: {len(changes['added'])} added, {len(changes['removed'])} removed, "
+                f"{len(changes['changed_after'])} changed record(s) across {len(changed_weeks)} week(s).")
+        with st.expander("What changed since last upload"):
+            for label, part in (("Added", changes["added"]), ("Removed", changes["removed"]),
+                                ("Changed (new values)", changes["changed_after"])):
+                if not part.empty:
+                    st.write(f"{label}:")
+                    st.dataframe(part[[c for c in ingest.EXPORT_COLUMNS if c in part.columns]], hide_index=True)
+    else:
+        workload_counts, workload_proposals = load_workload_index(upload_digest, df, name_mapping)
+
+    # --------------------------
+    # Workload Model: deadline-week counts or load spread over the preparation window
+    # --------------------------
+    workload_model = st.radio("Workload model:", list(workload_models), horizontal=True, key="workload_model",
+                              help="Deadline week counts each proposal in the week of its deadline. Preparation window "
+                                   "spreads it evenly over the 20 working days before the deadline (skipping holidays). "
+                                   "Assignment recommendations use deadline-week counts in both models.")
+    # Routing checks capacity in whole proposals per deadline week, whichever model is charted.
+    routing_counts = workload_counts
+    if workload_model == "Preparation window":
+        workload_counts, workload_proposals = load_window_index(upload_digest, df, name_mapping, holidays)
 
     # --------------------------
     # Function to Subtract Working Days (skipping weekends and Cal Poly holidays)
     # --------------------------
     def subtract_working_days(end_date, working_days):
-        current_date = end_date
-        days_subtracted = 0
-        while days_subtracted < working_days:
-            current_date -= timedelta(days=1)
-            if current_date.weekday() < 5 and current_date not in calpoly_holidays:
-                days_subtracted += 1
-        return current_date
+        calendar = get_holiday_calendar(holidays)
+        return business_days.subtract_working_days(end_date, working_days, calendar).item()
+
+    # --------------------------
+    # Proposals Whose Notification Window Has Already Started
+    # --------------------------
+    run_timer.start("notification window")
+    with st.expander("Proposals Inside the 20 Working Day Window"):
+        window_data = business_days.notification_window_open(df, datetime.today().date())
+        window_data = window_data[window_data['PreAward Analyst'].isin(name_mapping.keys())]
+        if window_data.empty:
+            st.write("No open proposals are inside their notification window.")
+        else:
+            window_table = pd.DataFrame({
+                'Record Number': window_data['Record Number'],
+                'Record Owner': window_data['Record Owner'],
+                'Analyst': window_data['PreAward Analyst'].map(name_mapping),
+                'Deadline Date': window_data['Deadline Date'].dt.date,
+                'Notification Date': window_data['Notification Date'].dt.date
+            }).sort_values(by='Deadline Date')
+            st.dataframe(window_table, hide_index=True)
 
     # --------------------------
     # Deadline Search Form
     # --------------------------
+    run_timer.start("deadline search")
     with st.form("search_form"):
         input_date = st.date_input("Select a Deadline Date (to choose a week):", datetime.today(), key="deadline_date")
         search_submit = st.form_submit_button("Search")
@@ -146,253 +253,128 @@ if uploaded_file:
         # Calculate the week start (Monday) for the selected deadline date.
         input_week_start = input_date - timedelta(days=input_date.weekday())
         st.write(f"Selected week start: {input_week_start}")
-        # Filter data for the selected week.
-        week_data = df[df['WeekStart_date'] == input_week_start]
-        st.write(f"Rows found for selected week: {len(week_data)}")
-
-        # --------------------------
-        # Build Proposals Info for Hover Text
-        # --------------------------
-        proposals_info = {}
-        for _, row in week_data.iterrows():
-            full_name = row['PreAward Analyst']
-            if full_name in name_mapping:
-                first_name = name_mapping[full_name]
-                proposal_str = f"{row['Record Number']}: {row['Record Owner']}"
-                proposals_info.setdefault(first_name, []).append(proposal_str)
-
-        # --------------------------
-        # Group Data by Analyst
-        # --------------------------
-        if not week_data.empty:
-            analyst_counts = week_data.groupby('PreAward Analyst')['Record Number'].count().reset_index()
-            analyst_counts.rename(columns={'Record Number': 'Count'}, inplace=True)
-        else:
-            analyst_counts = pd.DataFrame(columns=['PreAward Analyst', 'Count'])
-        analyst_counts = analyst_counts[analyst_counts['PreAward Analyst'].isin(name_mapping.keys())]
-        analyst_counts['PreAward Analyst'] = analyst_counts['PreAward Analyst'].map(name_mapping)
-        all_analysts_data = pd.DataFrame({
-            'PreAward Analyst': list(name_mapping.values()),
-            'Count': [0] * len(name_mapping)
-        })
-        final_data = pd.merge(all_analysts_data, analyst_counts, how='left', on='PreAward Analyst', suffixes=('_default', ''))
-        final_data['Count'] = final_data['Count'].fillna(0).astype(int)
-
-        # --------------------------
-        # Determine Custom Maximum Workload per Analyst for this Week
-        # --------------------------
-        def get_custom_max(analyst, week):
-            key = (analyst, str(week))
-            if key in st.session_state.custom_workload:
-                percent = st.session_state.custom_workload[key].get("percentage", 100)
-                return round(4 * percent / 100)
-            else:
-                return 4
-        final_data['custom_max'] = final_data['PreAward Analyst'].apply(lambda a: get_custom_max(a, input_week_start))
-
-        # --------------------------
-        # Add Color Column for the Bar Chart Based on Count:
-        # --------------------------
-        final_data['color'] = final_data['Count'].apply(lambda x: 'green' if x <= 2 else ('yellow' if x == 3 else 'red'))
-        muted_colors = {'green': '#66c2a5', 'yellow': '#ffd92f', 'red': '#fc8d62'}
-
-        final_data = final_data.sort_values(by='PreAward Analyst').reset_index(drop=True)
-        final_data['y'] = list(range(len(final_data)))
-
-        st.session_state['final_data'] = final_data
+        # Every open row due that week, including analysts outside the name mapping.
+        st.write(f"Rows found for selected week: {int((df['WeekStart_date'] == input_week_start).sum())}")
+        if workload_model == "Preparation window":
+            # Slice the precomputed week x analyst index for the selected week.
+            counts = workload.week_counts(workload_counts, input_week_start)
+            st.write(f"Preparation load of listed analysts in selected week: {counts.sum():.2f}")
+
         st.session_state['input_week_start'] = input_week_start
         st.session_state['input_date'] = input_date
 
-        # --------------------------
-        # Create Custom Hover Text for Each Analyst Bar
-        # --------------------------
-        hovertexts = []
-        for analyst in final_data['PreAward Analyst']:
-            proposals = proposals_info.get(analyst, [])
-            if proposals:
-                hovertexts.append("<br>".join(proposals))
-            else:
-                hovertexts.append("No proposals")
-        st.session_state['hovertexts'] = hovertexts
-
     # --------------------------
     # Display the Workload Chart (if available)
     # --------------------------
-    if "final_data" in st.session_state:
-        final_data = st.session_state["final_data"]
-        hovertexts = st.session_state.get("hovertexts", ["No proposals"] * len(final_data))
-        muted_colors = {'green': '#66c2a5', 'yellow': '#ffd92f', 'red': '#fc8d62'}
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=final_data['Count'],
-            y=final_data['y'],
-            orientation="h",
-            marker_color=[muted_colors[c] for c in final_data['color']],
-            text=final_data['Count'],
-            textposition="auto",
-            showlegend=False,
-            hovertext=hovertexts,
-            hovertemplate="%{hovertext}<extra></extra>"
-        ))
-        for idx, row in final_data.iterrows():
-            delta = 0.05
-            y_center = row['y']
-            x_val = row['custom_max']
-            fig.add_shape(
-                type="rect",
-                x0=x_val - delta,
-                x1=x_val + delta,
-                y0=y_center - 0.4,
-                y1=y_center + 0.4,
-                line=dict(color="black", width=2),
-                fillcolor="black",
-                layer="above"
-            )
-        # Add invisible scatter markers over the black boxes to display reasoning on hover.
-        marker_x = []
-        marker_y = []
-        marker_text = []
-        for idx, row in final_data.iterrows():
-            key = (row['PreAward Analyst'], str(st.session_state['input_week_start']))
-            reasoning = st.session_state.custom_workload.get(key, {}).get("reasoning", "No reasoning provided")
-            marker_x.append(row['custom_max'])
-            marker_y.append(row['y'])
-            marker_text.append(reasoning)
-        fig.add_trace(go.Scatter(
-            x=marker_x,
-            y=marker_y,
-            mode='markers',
-            marker=dict(size=20, opacity=0),
-            hoverinfo='text',
-            hovertext=marker_text,
-            showlegend=False
-        ))
-        fig.update_yaxes(
-            tickmode="array",
-            tickvals=final_data['y'],
-            ticktext=final_data['PreAward Analyst'],
-            automargin=True
-        )
-        fig.update_layout(
-            title="Workload Per Analyst",
-            xaxis_title="Number of Proposals",
-            yaxis_title="Analyst",
-            font=dict(color="black"),
-            showlegend=False
-        )
+    run_timer.start("workload chart")
+    if "input_week_start" in st.session_state:
+        # Cached on upload, model, week and custom workload version, so reruns that only
+        # toggle other widgets reuse the table and figure.
+        final_data, fig = get_week_chart(upload_digest, workload_model, st.session_state['input_week_start'],
+                                         custom_workload.version, workload_counts, workload_proposals)
         st.plotly_chart(fig)
 
         # =============================================================================
         # SECTION 3: ASSIGNMENTS & ASSIGNMENT RECOMMENDATION
         # =============================================================================
+        run_timer.start("assignments")
         st.header("Assignment Recommendation")
-        assignments_data = pd.DataFrame({
-            "Analyst": [
-                "Anxo",
-                "Julie",
-                "Kathy",
-                "Nazareth",
-                "Susanne",
-                "Tyler"
-            ],
-            "Departments Assigned": [
-                "Orfalea College of Business, Biomedical Engineering, California Cybersecurity Institute, Dean's Office, Electrical Engineering, Materials Engineering, Mechanical Engineering, Multicultural Engineering Program, General Engineering, Information Technology Services",
-                "College of Agriculture, Food & Environmental Sciences, Agricultural Education and Communication, Animal Science, BioResource and Agricultural Engineering, Cal Poly Strawberry Center, Dean's Office, Food Science & Nutrition, Military Science, Natural Resources Management & Environmental Sciences, Swanton Pacific Ranch, Wine and Viticulture",
-                "Various Academic Affairs Administration & Finance, College of Architecture and Environmental Design, College of Liberal Arts Division of Research, Bailey College of Science & Mathematics, University Development and Alumni Engagement, ARI Campus PAF/award processing, McIntire-Stennis proposals and award processing; Architectural Engineering, Architecture, City and Regional Planning, Construction Management, Landscape Architecture, Art and Design, Communication Studies, English, Ethnic Studies, Graphic Communication, History, Interdisciplinary Studies, Journalism, Music, Philosophy, Political Science, Psychology, Social Sciences, Theatre & Dance, Women's, Gender & Queer Studies, World Languages, Mathematics, Development and Alumni Engagement",
-                "Agribusiness, Experience Industry Management, Plant Sciences, Biological Sciences, Dean's Office, Liberal Studies, School of Education, Statistics, Student Academic Services, Student Affairs",
-                "Irrigation Training and Research Center, Chemistry and Biochemistry, Kinesiology and Public Health, Physics, Campus Health & Wellbeing, Center for Service in Action, Dean of Students, Student Life & Leadership, Office of the President",
-                "Aerospace Engineering, Civil & Environmental Engineering, Computer Engineering, Computer Science & Software Engineering, Industrial & Manufacturing Engineering, Cal Poly Corporation"
-            ],
-            "Primary Backup Analyst": [
-                "Tyler",
-                "Nazareth",
-                "Julie",
-                "Julie",
-                "Nazareth",
-                "Anxo"
-            ]
-        })
-
-        def group_departments(dept_string):
-            depts = [dept.strip() for dept in dept_string.split(",")]
-            groups = {
-                "Academic": [],
-                "Engineering": [],
-                "Science": [],
-                "Center/Institute": [],
-                "Administration": [],
-                "Arts/Communication": [],
-                "Other": []
-            }
-            for d in depts:
-                d_lower = d.lower()
-                if "college" in d_lower or "university" in d_lower or "education" in d_lower or "studies" in d_lower:
-                    groups["Academic"].append(d)
-                elif "engineering" in d_lower:
-                    groups["Engineering"].append(d)
-                elif ("science" in d_lower or "biology" in d_lower or "chemistry" in d_lower or "physics" in d_lower \
-                      or "mathematics" in d_lower or "statistics" in d_lower) and "engineering" not in d_lower:
-                    groups["Science"].append(d)
-                elif "institute" in d_lower or "center" in d_lower:
-                    groups["Center/Institute"].append(d)
-                elif "office" in d_lower or "dean" in d_lower or "administration" in d_lower or "services" in d_lower:
-                    groups["Administration"].append(d)
-                elif "art" in d_lower or "design" in d_lower or "communication" in d_lower or "journalism" in d_lower \
-                      or "music" in d_lower or "theatre" in d_lower:
-                    groups["Arts/Communication"].append(d)
+        # Loaded only when opened; the static tables come from get_assignments().
+        if st.toggle("Open Assignment Recommendation", key="open_assignments"):
+            assignments_html, department_index, department_candidates, departments_list = get_assignments()
+
+            if st.checkbox("Show Assignments", key="show_assignments_checkbox"):
+                st.subheader("Analyst Assignments")
+                css = """
+                <style>
+                table {width: 100%; border-collapse: collapse;}
+                th, td {vertical-align: top; padding: 5px; border: 1px solid #ccc; text-align: left;}
+                </style>
+                """
+                st.markdown(css, unsafe_allow_html=True)
+                st.markdown(assignments_html, unsafe_allow_html=True)
+
+            selected_department = st.selectbox("Select Department for Proposal Assignment", departments_list, key="dept_select")
+            if st.button("Recommend Assignment", key="recommend_assignment"):
+                # Same selection as the batch recommendation, for a one-row list.
+                week = st.session_state['input_week_start']
+                proposal = pd.DataFrame({"Department": [selected_department],
+                                         "Deadline Date": [st.session_state['input_date']]})
+                rec = routing.recommend_batch(proposal, department_candidates, routing_counts, get_custom_max).iloc[0]
+                if rec["Status"] == "Unknown department":
+                    st.error("No matching analyst found for the selected department.")
+                else:
+                    primaries = rec["Primary Analysts"]
+                    backups = rec["Backup Analysts"] if pd.notna(rec["Backup Analysts"]) else "none"
+                    if rec["Status"] == "Primary":
+                        st.success(f"Assign the proposal to **{rec['Recommended Analyst']}** (Primary Analyst). Current workload: {rec['Count']}/{rec['custom_max']}.")
+                    elif rec["Status"] == "Backup":
+                        week_load = workload.week_counts(routing_counts, week)
+                        primary_load = ", ".join(f"{a} {int(week_load.get(a, 0))}/{get_custom_max(a, week)}"
+                                                 for a in primaries.split(", "))
+                        st.warning(f"Primary analyst **{primaries}** is at capacity ({primary_load}). Recommend assigning to backup analyst **{rec['Recommended Analyst']}**. Current workload: {rec['Count']}/{rec['custom_max']}.")
+                    else:
+                        st.error(f"Both primary analyst **{primaries}** and backup analyst **{backups}** are at capacity. No assignment possible at this time.")
+                    if len(department_index.get(selected_department, [])) > 1:
+                        st.info(f"{selected_department} is covered by several analysts: {primaries}.")
+
+            # --------------------------
+            # Batch Recommendation for a List of Incoming Proposals
+            # --------------------------
+            run_timer.start("batch recommendation")
+            st.subheader("Batch Recommendation")
+            batch_file = st.file_uploader("Upload incoming proposals (columns: Department, Deadline Date)", type=["csv", "xlsx"], key="batch_upload")
+            if batch_file:
+                if batch_file.name.lower().endswith(".csv"):
+                    incoming = pd.read_csv(batch_file)
                 else:
-                    groups["Other"].append(d)
-            output_lines = []
-            order = ["Academic", "Engineering", "Science", "Center/Institute", "Administration", "Arts/Communication", "Other"]
-            for key in order:
-                if groups[key]:
-                    output_lines.append(f"<strong>{key}:</strong> " + ", ".join(groups[key]))
-            return "<br>".join(output_lines)
-
-        if st.checkbox("Show Assignments", key="show_assignments_checkbox"):
-            st.subheader("Analyst Assignments")
-            display_assignments_data = assignments_data.copy()
-            display_assignments_data["Departments Assigned"] = display_assignments_data["Departments Assigned"].apply(group_departments)
-            css = """
-            <style>
-            table {width: 100%; border-collapse: collapse;}
-            th, td {vertical-align: top; padding: 5px; border: 1px solid #ccc; text-align: left;}
-            </style>
-            """
-            st.markdown(css, unsafe_allow_html=True)
-            st.markdown(display_assignments_data.to_html(index=False, escape=False), unsafe_allow_html=True)
-
-        departments_list = []
-        for depts in assignments_data["Departments Assigned"]:
-            for dept in depts.split(","):
-                dept = dept.strip()
-                if dept and dept not in departments_list:
-                    departments_list.append(dept)
-        departments_list.sort()
-
-        selected_department = st.selectbox("Select Department for Proposal Assignment", departments_list, key="dept_select")
-        if st.button("Recommend Assignment", key="recommend_assignment"):
-            row_found = None
-            for idx, row in assignments_data.iterrows():
-                if selected_department.lower() in row["Departments Assigned"].lower():
-                    row_found = row
-                    break
-            if row_found is None:
-                st.error("No matching analyst found for the selected department.")
-            else:
-                primary_analyst = row_found["Analyst"]
-                backup_analyst = row_found["Primary Backup Analyst"]
-                final_data = st.session_state["final_data"]
-                primary_row = final_data[final_data["PreAward Analyst"] == primary_analyst]
-                backup_row = final_data[final_data["PreAward Analyst"] == backup_analyst]
-                primary_count = int(primary_row["Count"].iloc[0]) if not primary_row.empty else 0
-                primary_max = int(primary_row["custom_max"].iloc[0]) if not primary_row.empty else 4
-                backup_count = int(backup_row["Count"].iloc[0]) if not backup_row.empty else 0
-                backup_max = int(backup_row["custom_max"].iloc[0]) if not backup_row.empty else 4
-
-                if primary_count < primary_max:
-                    st.success(f"Assign the proposal to **{primary_analyst}** (Primary Analyst). Current workload: {primary_count}/{primary_max}.")
-                elif backup_count < backup_max:
-                    st.warning(f"Primary analyst **{primary_analyst}** is at capacity ({primary_count}/{primary_max}). Recommend assigning to backup analyst **{backup_analyst}**. Current workload: {backup_count}/{backup_max}.")
+                    incoming = pd.read_excel(batch_file, engine="openpyxl")
+                missing_columns = [c for c in ("Department", "Deadline Date") if c not in incoming.columns]
+                if missing_columns:
+                    st.error(f"Missing column(s) in uploaded list: {', '.join(missing_columns)}")
                 else:
-                    st.error(f"Both primary analyst **{primary_analyst}** and backup analyst **{backup_analyst}** are at capacity. No assignment possible at this time.")
+                    batch_result = routing.recommend_batch(incoming, department_candidates, routing_counts, get_custom_max)
+                    st.dataframe(batch_result, hide_index=True)
+                    st.download_button("Download Recommendations", batch_result.to_csv(index=False),
+                                       file_name="recommendations.csv", mime="text/csv")
+
+            # --------------------------
+            # Bulk Assignment of Unassigned Proposals in the Uploaded Workbook
+            # --------------------------
+            run_timer.start("bulk assignment")
+            st.subheader("Bulk Assignment")
+            unassigned_queue = load_unassigned_queue(upload_digest, files, omit_statuses)
+            st.write(f"Unassigned open proposals in upload: {len(unassigned_queue)}")
+            if ingest.DEPARTMENT_COLUMN not in unassigned_queue.columns:
+                st.info(f"Add a '{ingest.DEPARTMENT_COLUMN}' column to the export to route by department; proposals are otherwise spread across all analysts.")
+            if st.button("Assign Unassigned Proposals", key="bulk_assign", disabled=unassigned_queue.empty):
+                bulk_result = routing.optimize_assignments(unassigned_queue, department_candidates, routing_counts,
+                                                           get_custom_max, sorted(name_mapping.values()))
+                st.write(bulk_result["Status"].value_counts().rename("Proposals"))
+                st.dataframe(bulk_result, hide_index=True)
+                st.download_button("Download Assignments", bulk_result.to_csv(index=False),
+                                   file_name="bulk_assignments.csv", mime="text/csv")
+
+    # =============================================================================
+    # SECTION 4: MULTI-WEEK CAPACITY HEATMAP
+    # =============================================================================
+    run_timer.start("heatmap")
+    st.header("Capacity Across Weeks")
+    # Built only when opened; the figure is cached per upload, model and week range.
+    if st.toggle("Open Capacity Heatmap", key="open_heatmap"):
+        heatmap_weeks = st.number_input("Number of weeks to show:", min_value=1, max_value=52, value=16, key="heatmap_weeks")
+        heatmap_start = datetime.today().date() - timedelta(days=datetime.today().weekday())
+        week_starts = [heatmap_start + timedelta(weeks=i) for i in range(int(heatmap_weeks))]
+        heat_fig = get_heatmap_chart(upload_digest, workload_model, tuple(week_starts), custom_workload.version,
+                                     workload_counts, workload_proposals)
+        st.plotly_chart(heat_fig)
+
+# =============================================================================
+# ADMIN: STAGE TIMINGS FOR THIS RUN
+# =============================================================================
+run_timer.end()
+with st.expander("Performance (Admin)"):
+    st.checkbox("Track peak memory per stage (slower; applies from the next run)", key="profile_memory")
+    st.dataframe(run_timer.stages, hide_index=True)
+    st.write(f"Total script time: {run_timer.total_seconds():.3f} s")
+run_timer.write_log(upload=upload_digest if uploaded_files else None)
@@ -0,0 +1,77 @@
+"""Write synthetic pre-award exports for benchmarking the dashboard.
+
+The workbooks have the columns app.py reads (Record Status, PreAward Analyst,
+Deadline Date, Record Number, Record Owner) plus a Department column and
+filler columns, so they are about as wide as a real Cayuse-style export.
+
+    python benchmarks/generate_export.py --rows 100000 --output benchmarks/data/export_100000.xlsx
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import analysts_list as ANALYSTS, omit_statuses  # noqa: E402
+
+# Most rows in a multi-year export are closed; the app filters out the omitted statuses.
+STATUSES = list(omit_statuses) + ['In Development', 'Submitted', 'Pending Sponsor Review']
+STATUS_WEIGHTS = [0.65 / len(omit_statuses)] * len(omit_statuses) + [0.15, 0.15, 0.05]
+# A sample of the departments in settings.assignments, so every row can be routed.
+DEPARTMENTS = [
+    'Aerospace Engineering', 'Animal Science', 'Biological Sciences', 'Chemistry and Biochemistry',
+    'Civil & Environmental Engineering', 'Computer Science & Software Engineering', "Dean's Office",
+    'Electrical Engineering', 'Food Science & Nutrition', 'Kinesiology and Public Health', 'Mathematics',
+    'Mechanical Engineering', 'Physics', 'Psychology', 'School of Education', 'Statistics'
+]
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def generate_export(path, rows, seed=0, extra_columns=20, unassigned_fraction=0.02, years=3):
+    """Write a workbook with `rows` proposals spread over `years` years of deadlines."""
+    rng = np.random.default_rng(seed)
+    start = datetime(datetime.today().year - years + 1, 1, 1)
+    statuses = rng.choice(STATUSES, size=rows, p=STATUS_WEIGHTS)
+    analysts = rng.choice(ANALYSTS, size=rows).astype(object)
+    analysts[rng.random(rows) < unassigned_fraction] = None
+    departments = rng.choice(DEPARTMENTS, size=rows)
+    offsets = rng.integers(0, 365 * years, size=rows)
+    missing_deadline = rng.random(rows) < 0.01
+    owners = rng.integers(0, 400, size=rows)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Export")
+    ws.append(['Record Number', 'Record Status', 'PreAward Analyst', 'Record Owner', 'Department', 'Deadline Date']
+              + [f'Field {i}' for i in range(extra_columns)])
+    filler = [f'value {i}' for i in range(extra_columns)]
+    for i in range(rows):
+        deadline = None if missing_deadline[i] else start + timedelta(days=int(offsets[i]))
+        ws.append([f'{start.year % 100 + i // 100000:02d}-{i % 100000:05d}', statuses[i], analysts[i],
+                   f'Owner {owners[i]}', departments[i], deadline] + filler)
+    wb.save(path)
+    return path
+
+
+def export_path(rows, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"export_{rows}.xlsx")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="number of proposal rows")
+    parser.add_argument("--output", help="workbook path (default: benchmarks/data/export_<rows>.xlsx)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extra-columns", type=int, default=20, help="filler columns to widen the sheet")
+    args = parser.parse_args()
+    path = generate_export(args.output or export_path(args.rows), args.rows, seed=args.seed,
+                           extra_columns=args.extra_columns)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Time each stage of the dashboard pipeline on synthetic exports.
+
+Every stage is timed separately (best of --repeat runs) and reported as one
+JSON object per line, so results from two versions can be diffed or loaded
+into a DataFrame:
+
+    python benchmarks/run_benchmarks.py --rows 1000 10000 100000 --output bench.jsonl
+
+Workbooks are generated on first use and kept in benchmarks/data/.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import business_days  # noqa: E402
+import charts  # noqa: E402
+import ingest  # noqa: E402
+import routing  # noqa: E402
+import workload  # noqa: E402
+from benchmarks import generate_export  # noqa: E402
+from settings import assignments, name_mapping, omit_statuses  # noqa: E402
+
+INCOMING_PROPOSALS = 500
+
+
+def timed(fn, repeat):
+    """Best wall time of `repeat` calls and the result of the last one."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_stages(rows, repeat, full_read=False):
+    """Yield (stage, seconds, details) for every pipeline stage on a `rows` export."""
+    path = generate_export.export_path(rows)
+    if not os.path.exists(path):
+        generate_export.generate_export(path, rows)
+    with open(path, "rb") as f:
+        file_bytes = f.read()
+
+    max_lookup = lambda analyst, week: 4  # noqa: E731
+    calendar = business_days.build_calendar([])
+
+    # The dashboard's read path (every sheet, deduplicated on Record Number), without the snapshot.
+    seconds, raw = timed(lambda: ingest.read_workbooks([file_bytes], omit_statuses), repeat)
+    yield "excel_ingest_streaming", seconds, {"rows_kept": len(raw)}
+    if full_read:
+        seconds, full = timed(lambda: pd.read_excel(io.BytesIO(file_bytes), engine="openpyxl"), repeat)
+        yield "excel_ingest_full", seconds, {"rows_kept": len(full)}
+
+    seconds, df = timed(lambda: ingest.clean_export(raw, omit_statuses), repeat)
+    yield "cleaning", seconds, {"rows_kept": len(df)}
+
+    snapshot = os.path.join(generate_export.DATA_DIR, f"snapshot_{rows}.parquet")
+    seconds, _ = timed(lambda: ingest.write_snapshot(df, snapshot), repeat)
+    yield "snapshot_write", seconds, {}
+    seconds, _ = timed(lambda: ingest.read_snapshot(snapshot), repeat)
+    yield "snapshot_read", seconds, {}
+
+    seconds, df = timed(lambda: business_days.add_notification_dates(df, calendar), repeat)
+    yield "notification_dates", seconds, {}
+    seconds, _ = timed(lambda: business_days.subtract_working_days(date.today(), 20, calendar), repeat)
+    yield "subtract_working_days", seconds, {}
+
+    seconds, (counts, proposals) = timed(lambda: workload.build_workload_index(df, name_mapping), repeat)
+    yield "week_aggregation", seconds, {"weeks": len(counts)}
+    seconds, (load, _) = timed(lambda: workload.build_window_index(df, name_mapping, calendar), repeat)
+    yield "window_aggregation", seconds, {"weeks": len(load)}
+    weeks = list(counts.index)
+    seconds, _ = timed(lambda: [workload.week_counts(counts, w) for w in weeks], repeat)
+    yield "week_filtering", seconds, {"lookups": len(weeks)}
+    seconds, _ = timed(lambda: [workload.hover_text(proposals, w, a) for w in weeks for a in counts.columns], repeat)
+    yield "hover_text", seconds, {"cells": len(weeks) * len(counts.columns)}
+
+    busiest = counts.sum(axis=1).idxmax() if weeks else date.today()
+    reasoning = ["No reasoning provided"] * len(counts.columns)
+    seconds, _ = timed(lambda: charts.workload_figure(charts.week_table(counts, proposals, busiest, max_lookup),
+                                                      reasoning), repeat)
+    yield "figure_build", seconds, {}
+    week_starts = [busiest + timedelta(weeks=i) for i in range(16)]
+    seconds, _ = timed(lambda: charts.heatmap_figure(counts, proposals, week_starts, max_lookup), repeat)
+    yield "heatmap_build", seconds, {"weeks": len(week_starts)}
+
+    # The real assignment table; it covers every department in generate_export.DEPARTMENTS.
+    candidates = routing.department_table(routing.build_department_index(pd.DataFrame(assignments)))
+    rng = np.random.default_rng(1)
+    incoming = pd.DataFrame({
+        "Department": rng.choice(generate_export.DEPARTMENTS, size=INCOMING_PROPOSALS),
+        "Deadline Date": rng.choice(np.array(weeks or [date.today()], dtype="datetime64[D]"), size=INCOMING_PROPOSALS)
+    })
+    seconds, _ = timed(lambda: routing.recommend_batch(incoming, candidates, counts, max_lookup), repeat)
+    yield "recommend_batch", seconds, {"proposals": INCOMING_PROPOSALS}
+    seconds, _ = timed(lambda: routing.optimize_assignments(incoming, candidates, counts, max_lookup,
+                                                            sorted(name_mapping.values())), repeat)
+    yield "optimize_assignments", seconds, {"proposals": INCOMING_PROPOSALS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="export sizes to benchmark (e.g. 1000 10000 100000 1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best time is reported")
+    parser.add_argument("--full-read", action="store_true", help="also time pd.read_excel on the whole sheet")
+    parser.add_argument("--output", help="append JSON lines to this file as well as stdout")
+    args = parser.parse_args()
+
+    meta = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    out = open(args.output, "a") if args.output else None
+    try:
+        for rows in args.rows:
+            for stage, seconds, details in run_stages(rows, args.repeat, args.full_read):
+                record = dict(meta, rows=rows, stage=stage, seconds=round(seconds, 6), **details)
+                line = json.dumps(record)
+                print(line, flush=True)
+                if out:
+                    out.write(line + "\n")
+    finally:
+        if out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Business-day calendar for notification date calculation.
+
+Working days skip weekends and the configured holidays. The calendar is a
+NumPy busdaycalendar, so the notification date for every row of an upload is
+computed in one vectorized pass.
+"""
+import os
+from datetime import date
+
+import numpy as np
+
+# Proposals must be routed this many working days before their deadline.
+NOTIFICATION_WORKING_DAYS = 20
+
+
+def load_holidays(path):
+    """Read extra holidays from a text file, one ISO date per line ('#' starts a comment)."""
+    if not os.path.exists(path):
+        return []
+    holidays = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                holidays.append(date.fromisoformat(line))
+    return holidays
+
+
+def build_calendar(holidays):
+    """Monday-Friday calendar that also skips the given holiday dates."""
+    return np.busdaycalendar(weekmask="1111100", holidays=np.array(sorted(set(holidays)), dtype="datetime64[D]"))
+
+
+def subtract_working_days(end_dates, working_days, calendar):
+    """Date that is `working_days` working days before each end date.
+
+    Only working days strictly before the end date are counted, so an end date
+    on a weekend or holiday rolls forward to the next working day first.
+    Accepts a single date or an array-like of dates and returns the same shape.
+    """
+    days = np.asarray(end_dates, dtype="datetime64[D]")
+    return np.busday_offset(days, -working_days, roll="forward", busdaycal=calendar)
+
+
+def add_notification_dates(df, calendar, working_days=NOTIFICATION_WORKING_DAYS):
+    """Add a 'Notification Date' column computed from 'Deadline Date'."""
+    df = df.copy()
+    deadlines = df['Deadline Date'].to_numpy(dtype="datetime64[D]")
+    df['Notification Date'] = subtract_working_days(deadlines, working_days, calendar)
+    return df
+
+
+def notification_window_open(df, today):
+    """Rows whose notification window has started but whose deadline is still ahead."""
+    today = np.datetime64(today, "D")
+    notify = df['Notification Date'].to_numpy(dtype="datetime64[D]")
+    deadline = df['Deadline Date'].to_numpy(dtype="datetime64[D]")
+    return df[(notify <= today) & (deadline >= today)]
@@ -0,0 +1,107 @@
+"""Plotly figures for the workload dashboard.
+
+Every figure is built from whole columns: the capacity markers are a single
+scatter trace rather than one shape per analyst, so building cost does not
+grow with the number of Plotly objects.
+"""
+import pandas as pd
+import plotly.graph_objects as go
+
+import workload
+
+MUTED_COLORS = {'green': '#66c2a5', 'yellow': '#ffd92f', 'red': '#fc8d62'}
+
+
+def week_table(counts, proposals, week, max_lookup):
+    """Per-analyst table for one week start: Count, custom_max, color, y and hover text.
+
+    Count is a whole number of proposals, or a fractional load when `counts`
+    comes from the preparation-window model.
+    """
+    week_row = workload.week_counts(counts, week)
+    final_data = pd.DataFrame({'PreAward Analyst': week_row.index, 'Count': week_row.to_numpy()})
+    final_data['custom_max'] = [max_lookup(a, week) for a in final_data['PreAward Analyst']]
+    final_data['color'] = workload.count_colors(final_data['Count'])
+    final_data = final_data.sort_values(by='PreAward Analyst').reset_index(drop=True)
+    final_data['y'] = list(range(len(final_data)))
+    final_data['hovertext'] = [workload.hover_text(proposals, week, a) for a in final_data['PreAward Analyst']]
+    return final_data
+
+
+def workload_figure(final_data, reasoning, xaxis_title="Number of Proposals"):
+    """Horizontal bar chart of one week's counts with a capacity marker per analyst."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=final_data['Count'],
+        y=final_data['y'],
+        orientation="h",
+        marker_color=[MUTED_COLORS[c] for c in final_data['color']],
+        text=final_data['Count'],
+        textposition="auto",
+        showlegend=False,
+        hovertext=final_data['hovertext'],
+        hovertemplate="%{hovertext}<extra></extra>"
+    ))
+    # One trace for all capacity markers; hovering one shows the workload reasoning.
+    fig.add_trace(go.Scatter(
+        x=final_data['custom_max'],
+        y=final_data['y'],
+        mode='markers',
+        marker=dict(symbol='line-ns', size=36, line=dict(color="black", width=5)),
+        hoverinfo='text',
+        hovertext=reasoning,
+        showlegend=False
+    ))
+    fig.update_yaxes(
+        tickmode="array",
+        tickvals=final_data['y'],
+        ticktext=final_data['PreAward Analyst'],
+        automargin=True
+    )
+    fig.update_layout(
+        title="Workload Per Analyst",
+        xaxis_title=xaxis_title,
+        yaxis_title="Analyst",
+        font=dict(color="black"),
+        showlegend=False
+    )
+    return fig
+
+
+def heatmap_figure(counts, proposals, week_starts, max_lookup, title="Proposals per Analyst by Deadline Week"):
+    """Analyst x week heatmap of proposal counts for the given week starts."""
+    heat_counts = workload.weeks_slice(counts, week_starts)
+    heat_hover = [
+        [
+            f"Week of {week}<br>Max: {max_lookup(analyst, week)}<br>"
+            + workload.hover_text(proposals, week, analyst)
+            for week in week_starts
+        ]
+        for analyst in heat_counts.columns
+    ]
+    # Same thresholds as the bar chart: green up to 2, yellow up to 3, red above
+    # (color stops sit just past 2 and 3 on the 0-4 scale).
+    fig = go.Figure(go.Heatmap(
+        z=heat_counts.T.to_numpy(),
+        x=[str(w) for w in week_starts],
+        y=list(heat_counts.columns),
+        zmin=0,
+        zmax=4,
+        colorscale=[
+            [0.0, MUTED_COLORS['green']], [0.5025, MUTED_COLORS['green']],
+            [0.5025, MUTED_COLORS['yellow']], [0.7525, MUTED_COLORS['yellow']],
+            [0.7525, MUTED_COLORS['red']], [1.0, MUTED_COLORS['red']]
+        ],
+        text=heat_counts.T.to_numpy(),
+        texttemplate="%{text}",
+        hovertext=heat_hover,
+        hovertemplate="%{hovertext}<extra></extra>",
+        showscale=False
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Week Starting",
+        yaxis_title="Analyst",
+        font=dict(color="black")
+    )
+    return fig
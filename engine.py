@@ -0,0 +1,143 @@
+"""Headless workload engine and batch report command.
+
+Runs the dashboard's logic (cleaning, week bucketing, custom maximums, color
+thresholds and assignment recommendations) without Streamlit, for a whole
+date range in one pass:
+
+    python engine.py export.xlsx --start 2025-01-01 --end 2025-12-31 --output-dir reports --format parquet
+
+Several exports (e.g. one per fiscal year) can be given; they are combined as
+in the dashboard: in the order given, later files (then later sheets and
+rows) winning for the same Record Number.
+
+With --model window, Count is the preparation-window load (each proposal
+spread over the 20 working days before its deadline) instead of the number of
+proposals due that week. Bulk assignments use deadline-week counts either way.
+
+This writes weekly_workload (one row per week and analyst), capacity_alerts
+(the rows above their custom maximum) and, when the export has proposals
+without an analyst, bulk_assignments.
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import business_days
+import ingest
+import routing
+import workload
+import workload_store
+from settings import assignments, calpoly_holidays, default_max_proposals, name_mapping, omit_statuses
+
+REPORT_FORMATS = ("csv", "parquet")
+WORKLOAD_MODELS = ("deadline", "window")
+
+
+def capacity(percentage):
+    """Maximum proposals per week for a workload percentage."""
+    return round(default_max_proposals * percentage / 100)
+
+
+def custom_max(store, analyst, week):
+    """Maximum proposals for an analyst in a week, honoring custom workload levels."""
+    entry = store.get(analyst, week) if store is not None else None
+    if entry is not None:
+        return capacity(entry.get("percentage", 100))
+    return default_max_proposals
+
+
+def week_range(start, end):
+    """Monday week starts covering start..end inclusive."""
+    first = start - timedelta(days=start.weekday())
+    return [first + timedelta(weeks=i) for i in range((end - first).days // 7 + 1)]
+
+
+def load_export_files(paths, snapshot_dir=ingest.SNAPSHOT_DIR):
+    """Read and clean exports from disk, reusing the dashboard's snapshot cache."""
+    files = []
+    for path in paths:
+        with open(path, "rb") as f:
+            files.append(f.read())
+    df = ingest.load_exports(files, omit_statuses, snapshot_dir=snapshot_dir)
+    df = business_days.add_notification_dates(df, business_days.build_calendar(calpoly_holidays))
+    return df, files
+
+
+def weekly_workload(counts, proposals, week_starts, max_lookup):
+    """Long table of Count, custom_max, color and proposals per week and analyst."""
+    grid = workload.weeks_slice(counts, week_starts)
+    weekly = grid.stack().reset_index()
+    weekly.columns = ['WeekStart', 'Analyst', 'Count']
+    weekly['custom_max'] = [max_lookup(a, w) for a, w in zip(weekly['Analyst'], weekly['WeekStart'])]
+    weekly['color'] = workload.count_colors(weekly['Count'])
+    weekly['Over Capacity'] = weekly['Count'] > weekly['custom_max']
+    weekly['Proposals'] = ["; ".join(proposals.get((w, a), [])) for w, a in zip(weekly['WeekStart'], weekly['Analyst'])]
+    return weekly
+
+
+def capacity_alerts(weekly):
+    """Rows of a weekly_workload table whose count exceeds the custom maximum."""
+    return weekly[weekly['Over Capacity']].reset_index(drop=True)
+
+
+def write_table(df, output_dir, name, fmt):
+    path = os.path.join(output_dir, f"{name}.{fmt}")
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def run_report(export_paths, start, end, output_dir, fmt="csv", store=None, model="deadline"):
+    """Compute every week's workload for start..end and write the report tables.
+
+    Returns a dict mapping table name to the path written.
+    """
+    df, files = load_export_files(export_paths)
+    # Bulk assignment always checks capacity on deadline-week counts; the window
+    # model only changes the weekly_workload and capacity_alerts tables.
+    routing_counts, proposals = workload.build_workload_index(df, name_mapping)
+    counts = routing_counts
+    if model == "window":
+        counts, proposals = workload.build_window_index(df, name_mapping, business_days.build_calendar(calpoly_holidays))
+    max_lookup = lambda analyst, week: custom_max(store, analyst, week)  # noqa: E731
+    weekly = weekly_workload(counts, proposals, week_range(start, end), max_lookup)
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = {
+        "weekly_workload": write_table(weekly, output_dir, "weekly_workload", fmt),
+        "capacity_alerts": write_table(capacity_alerts(weekly), output_dir, "capacity_alerts", fmt)
+    }
+    queue = ingest.load_unassigned(files, omit_statuses)
+    queue = queue[(queue['Deadline Date'].dt.date >= start) & (queue['Deadline Date'].dt.date <= end)]
+    if not queue.empty:
+        candidates = routing.department_table(routing.build_department_index(assignments))
+        bulk = routing.optimize_assignments(queue, candidates, routing_counts, max_lookup, sorted(name_mapping.values()))
+        written["bulk_assignments"] = write_table(bulk, output_dir, "bulk_assignments", fmt)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute per-week workload tables from a pre-award export.")
+    parser.add_argument("exports", nargs="+", help="path(s) to .xlsx exports, oldest first")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today(), help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day (YYYY-MM-DD); default one year after start")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--format", choices=REPORT_FORMATS, default="csv")
+    parser.add_argument("--workload-db", default=workload_store.DB_PATH,
+                        help="custom workload database (skipped if it does not exist)")
+    parser.add_argument("--model", choices=WORKLOAD_MODELS, default="deadline",
+                        help="count proposals in their deadline week, or spread them over the preparation window")
+    args = parser.parse_args(argv)
+    end = args.end or args.start + timedelta(days=365)
+    if end < args.start:
+        parser.error(f"--end ({end}) is before --start ({args.start})")
+    store = workload_store.CustomWorkloadStore(args.workload_db) if os.path.exists(args.workload_db) else None
+    for name, path in run_report(args.exports, args.start, end, args.output_dir, args.format, store,
+                                   args.model).items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
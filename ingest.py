@@ -0,0 +1,400 @@
+"""Reading, cleaning and snapshotting of uploaded pre-award exports.
+
+The cleaned frame for an upload is keyed by a hash of the workbook bytes and
+persisted as a Parquet snapshot, so re-runs, new sessions and server restarts
+can memory-map it instead of parsing the XLSX again.
+
+Workbooks are parsed with openpyxl in read-only (streaming) mode by default:
+only the columns the dashboard uses are kept, and closed proposals or rows
+without an analyst or deadline are dropped while streaming, so peak memory
+follows the number of open proposals rather than the size of the export.
+
+An upload can be several workbooks with several sheets each, in upload order
+(oldest first). Records are deduplicated on Record Number while streaming;
+the copy from the last file, last sheet and last row wins, and closed rows are
+still dropped as they are read.
+Sheets are read in-process; only large multi-sheet uploads are spread over
+worker processes started from ingest_worker.py.
+
+The most recent upload is recorded next to the snapshots, so a fresh export
+can be diffed against the previous one by Record Number and only the changed
+records reprocessed. Only those two snapshots are kept.
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_DIR = "snapshots"
+# Part of every snapshot's file name. Bump it whenever reading, deduplication or
+# cleaning changes the cleaned frame, so snapshots from older code are not reused.
+SNAPSHOT_VERSION = 3
+# Uploads smaller than this are parsed in-process: a worker's start-up (about a
+# second to import pandas and openpyxl) outweighs what it saves.
+PARALLEL_MIN_BYTES = 4 * 2**20
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_worker.py")
+LATEST_POINTER = "latest.json"
+
+# Columns the dashboard actually uses; everything else in the export is dropped.
+EXPORT_COLUMNS = ['Record Status', 'PreAward Analyst', 'Deadline Date', 'Record Number', 'Record Owner']
+TEXT_COLUMNS = ['Record Status', 'PreAward Analyst', 'Record Number', 'Record Owner']
+# Columns read for proposals that have not been given an analyst yet.
+DEPARTMENT_COLUMN = 'Department'
+QUEUE_COLUMNS = ['Record Status', 'PreAward Analyst', 'Deadline Date', 'Record Number', 'Record Owner', DEPARTMENT_COLUMN]
+
+
+def content_hash(file_bytes):
+    """Return the SHA-256 hex digest of the uploaded workbook bytes."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def upload_hash(files):
+    """Digest for an upload of one or more workbooks in upload order (later files win)."""
+    if len(files) == 1:
+        return content_hash(files[0])
+    return hashlib.sha256("".join(content_hash(b) for b in files).encode("utf-8")).hexdigest()
+
+
+def snapshot_path(digest, omit_statuses, snapshot_dir=SNAPSHOT_DIR):
+    """Path of the snapshot for an upload, cleaned with the given status filter by this code version."""
+    statuses_key = hashlib.sha256("|".join(sorted(omit_statuses)).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(snapshot_dir, f"{digest}-{statuses_key}-v{SNAPSHOT_VERSION}.parquet")
+
+
+def clean_export(df, omit_statuses):
+    """Apply the dashboard's cleaning steps to a raw export frame."""
+    df = df[[c for c in EXPORT_COLUMNS if c in df.columns]]
+    df = df[~df['Record Status'].isin(omit_statuses)]
+    df = df.dropna(subset=['PreAward Analyst', 'Deadline Date'])
+    df = df.copy()
+    df['Deadline Date'] = pd.to_datetime(df['Deadline Date'], errors='coerce')
+    df = df.dropna(subset=['Deadline Date'])
+    # Calculate the week start for each deadline (Monday)
+    df['WeekStart'] = df['Deadline Date'] - pd.to_timedelta(df['Deadline Date'].dt.dayofweek, unit='D')
+    df['WeekStart_date'] = df['WeekStart'].dt.date
+    # Exports mix numbers and text in the same column; store text columns as strings.
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df.reset_index(drop=True)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _missing_mask(series):
+    return series.isna() | series.map(lambda v: isinstance(v, str) and not v.strip()).astype(bool)
+
+
+def read_export_streaming(file_obj, omit_statuses, columns=EXPORT_COLUMNS, unassigned=False, sheet_name=None,
+                          keys=None):
+    """Stream one sheet of a workbook, keeping only `columns` of open proposals.
+
+    Reads the first sheet unless sheet_name is given. With unassigned=True only
+    rows without a PreAward Analyst are kept instead; with unassigned=None rows
+    are kept whether or not they have an analyst.
+
+    When keys is a set, rows are deduplicated on Record Number while streaming:
+    a later row replaces an earlier one before the filters are applied (so a
+    record closed further down is dropped), and every Record Number read,
+    kept or not, is added to keys.
+    """
+    omit = set(omit_statuses)
+    wb = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        sheet = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        positions = {name: i for i, name in enumerate(header) if name in columns}
+        for required in ('Record Status', 'PreAward Analyst', 'Deadline Date'):
+            if required not in positions:
+                raise KeyError(required)
+        kept = [c for c in columns if c in positions]
+        status_i = positions['Record Status']
+        analyst_i = positions['PreAward Analyst']
+        deadline_i = positions['Deadline Date']
+        record_i = positions.get('Record Number') if keys is not None else None
+        # Kept rows by Record Number (a fresh object for rows without one), in
+        # the order of each record's last row.
+        data = {}
+        for row in rows:
+            # Read-only mode trims trailing empty cells, so rows can be short.
+            width = len(row)
+            record = row[record_i] if record_i is not None and record_i < width else None
+            if record is None:
+                key = object()
+            else:
+                key = str(record)
+                keys.add(key)
+                data.pop(key, None)
+            status = row[status_i] if status_i < width else None
+            analyst = row[analyst_i] if analyst_i < width else None
+            deadline = row[deadline_i] if deadline_i < width else None
+            if status in omit or _is_missing(deadline):
+                continue
+            if unassigned is not None and _is_missing(analyst) != unassigned:
+                continue
+            data[key] = [row[positions[c]] if positions[c] < width else None for c in kept]
+    finally:
+        wb.close()
+    return pd.DataFrame(list(data.values()), columns=kept)
+
+
+def sheet_names(file_bytes):
+    """Names of the sheets in a workbook, without loading their cells."""
+    wb = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def read_sheet(source, sheet_name, omit_statuses, columns=EXPORT_COLUMNS, unassigned=False):
+    """(frame, Record Numbers) for one sheet, or None if it has no export header.
+
+    source is the workbook's bytes or a path to it. The frame holds the open
+    rows left after deduplicating the sheet on Record Number (last row wins);
+    the set holds every Record Number in the sheet, so newer sheets can
+    override older ones.
+    """
+    file_obj = io.BytesIO(source) if isinstance(source, bytes) else source
+    keys = set()
+    try:
+        frame = read_export_streaming(file_obj, omit_statuses, columns, unassigned, sheet_name, keys=keys)
+    except KeyError:
+        return None
+    return frame, keys
+
+
+def combine_sources(frames, omit_statuses, unassigned=False):
+    """Concatenate per-sheet frames, keep the latest copy of each record, then filter.
+
+    Frames are in upload order, oldest first: a later frame wins for the same
+    Record Number, and within a frame a later row wins. Status and analyst
+    filters run after deduplication because the newest copy of a record may
+    be closed.
+    """
+    combined = pd.concat(frames, ignore_index=True)
+    keys = combined['Record Number']
+    keys = keys.where(keys.isna(), keys.astype(str))
+    combined = combined[keys.isna() | ~keys.duplicated(keep='last')]
+    combined = combined[~combined['Record Status'].isin(omit_statuses)]
+    keep = ~_missing_mask(combined['Deadline Date'])
+    if unassigned is not None:
+        keep &= _missing_mask(combined['PreAward Analyst']) == unassigned
+    return combined[keep].reset_index(drop=True)
+
+
+def _run_worker(tasks):
+    """Run one ingest_worker process over a list of read_sheet argument tuples."""
+    result = subprocess.run([sys.executable, WORKER_SCRIPT], input=pickle.dumps(tasks), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError("Sheet worker failed: " + result.stderr.decode(errors="replace").strip()[-2000:])
+    return pickle.loads(result.stdout)
+
+
+def _read_sheets_parallel(files, sheets, omit_statuses, columns, unassigned, workers):
+    """Read (file index, sheet name) pairs in worker processes, in order.
+
+    Each workbook is written to a temporary file once, and workers open it by
+    path. Workers start from ingest_worker.py rather than multiprocessing's
+    spawn, which would re-import the parent's __main__ (under Streamlit that is
+    app.py, run again outside the password check).
+    """
+    with tempfile.TemporaryDirectory(prefix="ingest-") as tmp_dir:
+        paths = []
+        for i, file_bytes in enumerate(files):
+            paths.append(os.path.join(tmp_dir, f"{i}.xlsx"))
+            with open(paths[-1], "wb") as f:
+                f.write(file_bytes)
+        tasks = [(paths[i], name, tuple(omit_statuses), columns, unassigned) for i, name in sheets]
+        # Round-robin so each worker pays the interpreter start-up once.
+        groups = [tasks[w::workers] for w in range(workers)]
+        # Threads only wait on the worker processes, so the GIL is not a bottleneck.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_worker, groups))
+    frames = [None] * len(tasks)
+    for w, group_frames in enumerate(results):
+        frames[w::workers] = group_frames
+    return frames
+
+
+def read_workbooks(files, omit_statuses, columns=EXPORT_COLUMNS, unassigned=False,
+                   parallel_min_bytes=PARALLEL_MIN_BYTES, max_workers=None):
+    """Stream every sheet of every workbook into one deduplicated frame.
+
+    files are workbook bytes in upload order, oldest first. Sheets without the
+    export header (notes, pivots) are skipped. For a Record Number found more
+    than once, the copy in the last file, then the last sheet, then the last
+    row wins, even when that copy is closed. Each sheet is filtered while it
+    streams, so memory follows the open rows plus one set of Record Numbers.
+
+    Sheets are read one after another unless more than one worker can run and
+    the upload is at least parallel_min_bytes, in which case they are spread
+    over up to max_workers (default: CPU count) worker processes.
+    """
+    sheets = [(i, name) for i, b in enumerate(files) for name in sheet_names(b)]
+    workers = min(len(sheets), max_workers or os.cpu_count() or 1)
+    if workers > 1 and sum(len(b) for b in files) >= parallel_min_bytes:
+        results = _read_sheets_parallel(files, sheets, omit_statuses, columns, unassigned, workers)
+    else:
+        results = [read_sheet(files[i], name, omit_statuses, columns, unassigned) for i, name in sheets]
+
+    # Newest sheet first: drop rows whose record appears in any newer sheet.
+    frames = []
+    seen = set()
+    for result in reversed(results):
+        if result is None:
+            continue
+        frame, keys = result
+        if seen and 'Record Number' in frame.columns:
+            records = frame['Record Number']
+            records = records.where(records.isna(), records.astype(str))
+            frame = frame[records.isna() | ~records.isin(seen)]
+        seen |= keys
+        frames.append(frame)
+    if not frames:
+        raise KeyError('Record Status')
+    return pd.concat(frames[::-1], ignore_index=True)
+
+
+def read_snapshot(path):
+    """Load a snapshot, memory-mapping the Parquet file."""
+    table = pq.read_table(path, memory_map=True)
+    return table.to_pandas()
+
+
+def write_snapshot(df, path):
+    """Write a snapshot atomically so concurrent readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_exports(files, omit_statuses, digest=None, snapshot_dir=SNAPSHOT_DIR, streaming=True):
+    """Return the cleaned frame for an upload of one or more workbooks.
+
+    Reuses the upload's snapshot when present. With streaming=False every sheet
+    is loaded whole with pd.read_excel first.
+    """
+    digest = digest or upload_hash(files)
+    path = snapshot_path(digest, omit_statuses, snapshot_dir)
+    if os.path.exists(path):
+        return read_snapshot(path)
+    if streaming:
+        raw = read_workbooks(files, omit_statuses)
+    else:
+        frames = []
+        for file_bytes in files:
+            sheets = pd.read_excel(io.BytesIO(file_bytes), engine="openpyxl", sheet_name=None)
+            frames.extend(f for f in sheets.values() if 'Record Status' in f.columns)
+        raw = combine_sources(frames, omit_statuses, unassigned=None)
+    df = clean_export(raw, omit_statuses)
+    try:
+        write_snapshot(df, path)
+    except (OSError, pa.ArrowException):
+        # A failed snapshot only costs a re-parse next time.
+        pass
+    return df
+
+
+def load_export(file_bytes, omit_statuses, digest=None, snapshot_dir=SNAPSHOT_DIR, streaming=True):
+    """Return the cleaned frame for a single uploaded workbook."""
+    return load_exports([file_bytes], omit_statuses, digest, snapshot_dir, streaming)
+
+
+def load_unassigned(files, omit_statuses):
+    """Open proposals in an upload that have a deadline but no PreAward Analyst yet."""
+    df = read_workbooks(files, omit_statuses, QUEUE_COLUMNS, unassigned=True)
+    df['Deadline Date'] = pd.to_datetime(df['Deadline Date'], errors='coerce')
+    return df.dropna(subset=['Deadline Date']).reset_index(drop=True)
+
+
+def record_upload(digest, omit_statuses, snapshot_dir=SNAPSHOT_DIR):
+    """Record a newly ingested upload as the latest and return the one before it.
+
+    Returns {"digest", "path"} of the previous upload, or None. Call this once
+    when an upload is first ingested, not on every rerun: the pointer is shared
+    by all sessions. Snapshots other than this upload's and the previous one
+    are deleted. Re-recording the latest digest keeps its previous upload.
+    """
+    pointer = os.path.join(snapshot_dir, LATEST_POINTER)
+    path = snapshot_path(digest, omit_statuses, snapshot_dir)
+    latest = None
+    if os.path.exists(pointer):
+        try:
+            with open(pointer, "r") as f:
+                latest = json.load(f)
+        except (OSError, ValueError):
+            latest = None
+    if latest is not None and latest.get("digest") == digest:
+        previous = latest.get("previous")
+    else:
+        previous = {"digest": latest["digest"], "path": latest["path"]} if latest else None
+        os.makedirs(snapshot_dir, exist_ok=True)
+        tmp_path = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"digest": digest, "path": path, "previous": previous}, f)
+        os.replace(tmp_path, pointer)
+    keep = {os.path.normpath(path)}
+    if previous is not None:
+        keep.add(os.path.normpath(previous["path"]))
+    prune_snapshots(keep, snapshot_dir)
+    if previous is None or not os.path.exists(previous["path"]):
+        return None
+    return previous
+
+
+def prune_snapshots(keep, snapshot_dir=SNAPSHOT_DIR):
+    """Delete every snapshot in snapshot_dir whose path is not in `keep`."""
+    try:
+        names = os.listdir(snapshot_dir)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.normpath(os.path.join(snapshot_dir, name))
+        if name.endswith(".parquet") and path not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                # Already removed by another session, or still open on Windows.
+                pass
+
+
+def diff_exports(old, new, key='Record Number'):
+    """Records added, removed and changed between two cleaned frames.
+
+    Returns a dict of frames: "added" and "removed" rows, and "changed_before"
+    and "changed_after" for records whose export columns differ. Returns None
+    when either frame has missing or duplicate keys, since records cannot be
+    matched one to one.
+    """
+    for df in (old, new):
+        if df[key].isna().any() or df[key].duplicated().any():
+            return None
+    old_i = old.set_index(key, drop=False)
+    new_i = new.set_index(key, drop=False)
+    common = old_i.index.intersection(new_i.index)
+    compare = [c for c in EXPORT_COLUMNS if c != key and c in old.columns and c in new.columns]
+    before = old_i.loc[common, compare]
+    after = new_i.loc[common, compare]
+    differs = ((before != after) & ~(before.isna() & after.isna())).any(axis=1)
+    changed = common[differs.to_numpy()]
+    return {
+        "added": new_i.loc[new_i.index.difference(old_i.index)].reset_index(drop=True),
+        "removed": old_i.loc[old_i.index.difference(new_i.index)].reset_index(drop=True),
+        "changed_before": old_i.loc[changed].reset_index(drop=True),
+        "changed_after": new_i.loc[changed].reset_index(drop=True)
+    }
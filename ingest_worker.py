@@ -0,0 +1,21 @@
+"""Worker process for ingest.read_workbooks.
+
+Started as `python ingest_worker.py` with a pickled list of ingest.read_sheet
+argument tuples (workbook path, sheet name, ...) on stdin; writes the pickled
+list of results to stdout. Being its own entry module, a worker never imports
+the script that started it.
+"""
+import pickle
+import sys
+
+import ingest
+
+
+def main():
+    tasks = pickle.load(sys.stdin.buffer)
+    results = [ingest.read_sheet(*task) for task in tasks]
+    pickle.dump(results, sys.stdout.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+if __name__ == "__main__":
+    main()
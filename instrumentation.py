@@ -0,0 +1,107 @@
+"""Per-run stage timing and memory instrumentation.
+
+A RunTimer splits one script run into named stages and records wall time for
+each, plus peak traced memory when memory tracking is on. Runs are appended to
+a JSON-lines log so hot paths can be compared across real sessions.
+
+Memory is measured with tracemalloc, which only sees allocations made through
+Python's allocator (NumPy and pandas buffers are included, Arrow buffers are
+not) and is process-wide, so concurrent sessions can inflate each other's
+peaks. Tracing also slows allocation down, which is why it is opt-in.
+
+Because tracing is shared, it is started by the first timer that tracks memory
+and stopped only when no tracking timer is left. A timer without tracking never
+touches it. A stage whose tracing was stopped or restarted part way through
+gets no peak_mb.
+"""
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+
+RUN_LOG = "stage_timings.jsonl"
+
+_tracing_lock = threading.Lock()
+# Timers currently tracking memory; tracing stops when the last one closes.
+_tracking_timers = weakref.WeakSet()
+# Bumped whenever tracing starts, so a stage can tell it was not interrupted.
+_tracing_generation = 0
+
+
+def _tracing_state():
+    return tracemalloc.is_tracing(), _tracing_generation
+
+
+class RunTimer:
+    """Wall time (and optionally peak memory) for the named stages of one run."""
+
+    def __init__(self, track_memory=False):
+        global _tracing_generation
+        self.track_memory = track_memory
+        if track_memory:
+            with _tracing_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing_generation += 1
+                _tracking_timers.add(self)
+        self.stages = []
+        self._current = None
+        self._started = time.perf_counter()
+
+    def start(self, name):
+        """End the current stage, if any, and start timing `name`."""
+        self.end()
+        base_memory = 0
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base_memory = tracemalloc.get_traced_memory()[0]
+        self._current = (name, time.perf_counter(), base_memory, _tracing_state())
+
+    def end(self):
+        """End the current stage and record it."""
+        if self._current is None:
+            return
+        name, started, base_memory, tracing = self._current
+        record = {"stage": name, "seconds": round(time.perf_counter() - started, 6)}
+        if self.track_memory and tracing == (True, _tracing_generation) and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1] - base_memory
+            # Another session's reset_peak() can leave the peak below our baseline.
+            if peak >= 0:
+                record["peak_mb"] = round(peak / 2**20, 3)
+        self.stages.append(record)
+        self._current = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with-block as one stage."""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def close(self):
+        """End the current stage and release memory tracing if no other timer uses it."""
+        self.end()
+        if self.track_memory:
+            with _tracing_lock:
+                _tracking_timers.discard(self)
+                if not _tracking_timers and tracemalloc.is_tracing():
+                    tracemalloc.stop()
+
+    def total_seconds(self):
+        return round(time.perf_counter() - self._started, 6)
+
+    def write_log(self, path=RUN_LOG, **fields):
+        """Close the timer and append this run (plus any extra fields) to a JSON-lines log."""
+        self.close()
+        record = dict(fields, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      total_seconds=self.total_seconds(), stages=self.stages)
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            # Instrumentation must never break the dashboard.
+            pass
@@ -0,0 +1,194 @@
+"""Department-to-analyst routing and assignment recommendations.
+
+The assignment table is turned into an exact-match index once: each
+department maps to every (primary, backup) pair that covers it, in table
+order. Recommendations for a list of incoming proposals are then made in one
+pass, in list order, against the week x analyst count matrix, and a queue of
+unassigned proposals can be assigned in one greedy solve in deadline order.
+Both use up weekly capacity as they go, so no slot is handed out twice.
+"""
+import pandas as pd
+
+# Backups are only considered after every primary analyst for the department.
+_BACKUP_PRIORITY_OFFSET = 1000
+
+
+def split_departments(dept_string):
+    """Department names listed in one "Departments Assigned" cell."""
+    return [dept.strip() for dept in dept_string.split(",") if dept.strip()]
+
+
+# Display groups for the assignments table, checked in order; the first match wins.
+DEPARTMENT_GROUPS = [
+    ("Academic", ("college", "university", "education", "studies")),
+    ("Engineering", ("engineering",)),
+    ("Science", ("science", "biology", "chemistry", "physics", "mathematics", "statistics")),
+    ("Center/Institute", ("institute", "center")),
+    ("Administration", ("office", "dean", "administration", "services")),
+    ("Arts/Communication", ("art", "design", "communication", "journalism", "music", "theatre")),
+]
+
+
+def group_departments(dept_string):
+    """HTML lines grouping the departments in one "Departments Assigned" cell."""
+    groups = {}
+    for dept in split_departments(dept_string):
+        d_lower = dept.lower()
+        group = next((name for name, words in DEPARTMENT_GROUPS if any(w in d_lower for w in words)), "Other")
+        groups.setdefault(group, []).append(dept)
+    order = [name for name, _ in DEPARTMENT_GROUPS] + ["Other"]
+    return "<br>".join(f"<strong>{key}:</strong> " + ", ".join(groups[key]) for key in order if key in groups)
+
+
+def build_department_index(assignments_data):
+    """Map each department to the list of (primary, backup) analysts covering it."""
+    index = {}
+    for analyst, depts, backup in zip(assignments_data["Analyst"],
+                                      assignments_data["Departments Assigned"],
+                                      assignments_data["Primary Backup Analyst"]):
+        for dept in split_departments(depts):
+            pair = (analyst, backup)
+            if pair not in index.setdefault(dept, []):
+                index[dept].append(pair)
+    return index
+
+
+def department_table(department_index):
+    """Long-form candidate table: one row per department, analyst and role."""
+    rows = []
+    for dept, pairs in department_index.items():
+        for rank, (primary, backup) in enumerate(pairs):
+            rows.append((dept, primary, "Primary", rank))
+            rows.append((dept, backup, "Backup", _BACKUP_PRIORITY_OFFSET + rank))
+    table = pd.DataFrame(rows, columns=["Department", "Analyst", "Role", "Priority"])
+    # An analyst who is primary for a department is never also listed as its backup.
+    return table.sort_values(["Department", "Priority"]).drop_duplicates(["Department", "Analyst"])
+
+
+class _WeeklySlots:
+    """Capacity left per (week, analyst), used up as proposals are recommended.
+
+    A cell starts at max_lookup(analyst, week) minus its count in `counts`.
+    """
+
+    def __init__(self, counts, max_lookup):
+        self._current = counts.stack().to_dict()
+        self._max_lookup = max_lookup
+        self._limits = {}
+        self._used = {}
+
+    def _cell(self, analyst, week):
+        key = (week, analyst)
+        if key not in self._limits:
+            self._limits[key] = self._max_lookup(analyst, week)
+            self._used[key] = int(self._current.get(key, 0))
+        return key
+
+    def limit(self, analyst, week):
+        return self._limits[self._cell(analyst, week)]
+
+    def used(self, analyst, week):
+        return self._used[self._cell(analyst, week)]
+
+    def free(self, analyst, week):
+        key = self._cell(analyst, week)
+        return self._limits[key] - self._used[key]
+
+    def take(self, analyst, week):
+        self._used[self._cell(analyst, week)] += 1
+
+
+def recommend_batch(proposals, candidates, counts, max_lookup):
+    """Recommend an analyst for every row of `proposals`.
+
+    proposals needs 'Department' and 'Deadline Date' columns. candidates is the
+    output of department_table, counts the week x analyst matrix from
+    workload.build_workload_index, and max_lookup(analyst, week) the capacity
+    for one analyst and week. Each proposal goes to the first primary analyst
+    with spare capacity in its deadline week, otherwise the first backup.
+    Rows are served in list order and each recommendation uses up a slot, so
+    two rows never get the same last free slot.
+    The returned frame is a copy of proposals with these columns added:
+    'Recommended Analyst', 'Role', 'Count' (the load before this proposal,
+    including earlier rows), 'custom_max', 'Status', 'Primary Analysts' and
+    'Backup Analysts'.
+    """
+    result = proposals.reset_index(drop=True).copy()
+    deadlines = pd.to_datetime(result["Deadline Date"], errors="coerce")
+    week_starts = (deadlines - pd.to_timedelta(deadlines.dt.dayofweek, unit="D")).dt.date
+    requests = pd.DataFrame({
+        "Proposal": result.index,
+        "Department": result["Department"].astype(str).str.strip(),
+        "WeekStart_date": week_starts
+    })
+    long = requests[deadlines.notna().to_numpy()].merge(candidates, on="Department", how="inner")
+    long = long.sort_values(["Proposal", "Priority"], kind="stable")
+
+    slots = _WeeklySlots(counts, max_lookup)
+    chosen = {}
+    for proposal, week, analyst, role in zip(long["Proposal"], long["WeekStart_date"], long["Analyst"], long["Role"]):
+        if proposal in chosen or slots.free(analyst, week) <= 0:
+            continue
+        chosen[proposal] = (analyst, role, slots.used(analyst, week), slots.limit(analyst, week))
+        slots.take(analyst, week)
+    chosen = pd.DataFrame.from_dict(chosen, orient="index", columns=["Analyst", "Role", "Count", "custom_max"])
+    names = long.groupby(["Proposal", "Role"])["Analyst"].agg(", ".join).unstack()
+    names = names.reindex(index=result.index, columns=["Primary", "Backup"])
+
+    result["Recommended Analyst"] = chosen["Analyst"].reindex(result.index)
+    result["Role"] = chosen["Role"].reindex(result.index)
+    result["Count"] = chosen["Count"].reindex(result.index).astype("Int64")
+    result["custom_max"] = chosen["custom_max"].reindex(result.index).astype("Int64")
+    result["Primary Analysts"] = names["Primary"].to_numpy()
+    result["Backup Analysts"] = names["Backup"].to_numpy()
+    result["Status"] = result["Role"].fillna("At capacity")
+    result.loc[result["Primary Analysts"].isna(), "Status"] = "Unknown department"
+    result.loc[deadlines.isna().to_numpy(), "Status"] = "Invalid deadline"
+    return result
+
+
+def optimize_assignments(queue, candidates, counts, max_lookup, analysts):
+    """Assign every proposal in `queue` to an analyst, respecting weekly capacity.
+
+    Proposals are taken in deadline order. Each one goes to the primary
+    analyst for its department with the most free slots in its deadline week,
+    otherwise a backup, otherwise any other analyst in `analysts`. Slots are
+    max_lookup(analyst, week) minus the current count in `counts` and are
+    used up as proposals are assigned. Returns a copy of queue with
+    'WeekStart_date', 'Recommended Analyst', 'Role', 'Count', 'custom_max'
+    and 'Status' columns added; Count is the analyst's load including it.
+    """
+    result = queue.reset_index(drop=True).copy()
+    deadlines = pd.to_datetime(result["Deadline Date"], errors="coerce")
+    result["WeekStart_date"] = (deadlines - pd.to_timedelta(deadlines.dt.dayofweek, unit="D")).dt.date
+    departments = result["Department"].astype(str).str.strip() if "Department" in result else pd.Series("", index=result.index)
+
+    roles = candidates.groupby(["Department", "Role"])["Analyst"].agg(list).to_dict()
+    slots = _WeeklySlots(counts, max_lookup)
+
+    chosen = {}
+    for i in deadlines.sort_values(na_position="last", kind="stable").index:
+        if pd.isna(deadlines[i]):
+            chosen[i] = (None, None, None, None, "Invalid deadline")
+            continue
+        week = result.at[i, "WeekStart_date"]
+        primaries = roles.get((departments[i], "Primary"), [])
+        backups = roles.get((departments[i], "Backup"), [])
+        others = [a for a in analysts if a not in primaries and a not in backups]
+        chosen[i] = (None, None, None, None, "No capacity")
+        for role, group in (("Primary", primaries), ("Backup", backups), ("Other", others)):
+            open_analysts = [a for a in group if slots.free(a, week) > 0]
+            if open_analysts:
+                # max() keeps the first analyst on ties, i.e. assignment table order.
+                analyst = max(open_analysts, key=lambda a: slots.free(a, week))
+                slots.take(analyst, week)
+                chosen[i] = (analyst, role, slots.used(analyst, week), slots.limit(analyst, week), role)
+                break
+
+    columns = ["Recommended Analyst", "Role", "Count", "custom_max", "Status"]
+    assigned = pd.DataFrame.from_dict(chosen, orient="index", columns=columns).reindex(result.index)
+    for col in columns:
+        result[col] = assigned[col]
+    result["Count"] = result["Count"].astype("Int64")
+    result["custom_max"] = result["custom_max"].astype("Int64")
+    return result
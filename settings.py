@@ -0,0 +1,78 @@
+"""Editable settings shared by the dashboard and the batch report engine."""
+from datetime import datetime
+
+import business_days
+
+# Editable lists:
+omit_statuses = ['Award Received', 'Post-award Intake', 'Declined', 'Turned Away', 'Withdrawn']
+analysts_list = [
+    'Gartner, Susanne B',
+    'Alvord, Tyler',
+    'Dolengewicz, Julie F',
+    'Vazquez-Lozada, Anxo',
+    'Lijiam, Nazareth',
+    'Simon, Kathy'
+]
+
+# Create a mapping from full name to first name for display purposes.
+name_mapping = {full: full.split(',')[1].strip().split()[0] for full in analysts_list}
+
+# -----------------------------------------------------------------------------
+# Define Cal Poly holidays for 2025-2026 (used for notification deadline calculation)
+# -----------------------------------------------------------------------------
+calpoly_holidays = [
+    datetime(2025, 1, 1).date(),    # New Year's Day
+    datetime(2025, 1, 20).date(),   # Martin Luther King, Jr., holiday
+    datetime(2025, 3, 31).date(),   # Cesar Chavez Day
+    datetime(2025, 5, 26).date(),   # Memorial Day
+    datetime(2025, 6, 19).date(),   # Juneteenth
+    datetime(2025, 7, 4).date(),    # Independence Day
+    datetime(2025, 9, 1).date(),    # Labor Day
+    datetime(2025, 11, 11).date(),  # Veterans’ Day
+    datetime(2025, 11, 27).date(),  # Thanksgiving Day
+    datetime(2025, 11, 28).date(),  # Lincoln’s Birthday observed
+    datetime(2025, 12, 25).date(),  # Christmas Day observed
+    datetime(2025, 12, 26).date(),  # Washington’s Birthday observed
+    datetime(2025, 12, 29).date(),  # California Admission Day observed
+    datetime(2025, 12, 30).date(),  # Indigenous Peoples’ Day observed
+    datetime(2025, 12, 31).date(),  # Campus closed (anticipated Governor/President holiday)
+    datetime(2026, 1, 1).date(),    # New Year's Day
+    datetime(2026, 1, 19).date()    # Martin Luther King, Jr., holiday
+]
+# Additional closures can be listed in holidays.txt (one YYYY-MM-DD per line).
+calpoly_holidays = calpoly_holidays + business_days.load_holidays("holidays.txt")
+
+# -----------------------------------------------------------------------------
+# Capacity: a 100% workload level is this many proposals per week
+# -----------------------------------------------------------------------------
+default_max_proposals = 4
+
+# -----------------------------------------------------------------------------
+# Analyst assignments: departments and primary backup per analyst
+# -----------------------------------------------------------------------------
+assignments = {
+    "Analyst": [
+        "Anxo",
+        "Julie",
+        "Kathy",
+        "Nazareth",
+        "Susanne",
+        "Tyler"
+    ],
+    "Departments Assigned": [
+        "Orfalea College of Business, Biomedical Engineering, California Cybersecurity Institute, Dean's Office, Electrical Engineering, Materials Engineering, Mechanical Engineering, Multicultural Engineering Program, General Engineering, Information Technology Services",
+        "College of Agriculture, Food & Environmental Sciences, Agricultural Education and Communication, Animal Science, BioResource and Agricultural Engineering, Cal Poly Strawberry Center, Dean's Office, Food Science & Nutrition, Military Science, Natural Resources Management & Environmental Sciences, Swanton Pacific Ranch, Wine and Viticulture",
+        "Various Academic Affairs Administration & Finance, College of Architecture and Environmental Design, College of Liberal Arts Division of Research, Bailey College of Science & Mathematics, University Development and Alumni Engagement, ARI Campus PAF/award processing, McIntire-Stennis proposals and award processing; Architectural Engineering, Architecture, City and Regional Planning, Construction Management, Landscape Architecture, Art and Design, Communication Studies, English, Ethnic Studies, Graphic Communication, History, Interdisciplinary Studies, Journalism, Music, Philosophy, Political Science, Psychology, Social Sciences, Theatre & Dance, Women's, Gender & Queer Studies, World Languages, Mathematics, Development and Alumni Engagement",
+        "Agribusiness, Experience Industry Management, Plant Sciences, Biological Sciences, Dean's Office, Liberal Studies, School of Education, Statistics, Student Academic Services, Student Affairs",
+        "Irrigation Training and Research Center, Chemistry and Biochemistry, Kinesiology and Public Health, Physics, Campus Health & Wellbeing, Center for Service in Action, Dean of Students, Student Life & Leadership, Office of the President",
+        "Aerospace Engineering, Civil & Environmental Engineering, Computer Engineering, Computer Science & Software Engineering, Industrial & Manufacturing Engineering, Cal Poly Corporation"
+    ],
+    "Primary Backup Analyst": [
+        "Tyler",
+        "Nazareth",
+        "Julie",
+        "Julie",
+        "Nazareth",
+        "Anxo"
+    ]
+}
@@ -0,0 +1,161 @@
+"""Precomputed week x analyst workload index.
+
+The index is built once per upload: a count matrix with one row per week start
+(Monday) and one column per analyst first name, plus the proposal labels that
+fall in each cell for hover text. Looking up a week is then a single row slice
+instead of a filter, groupby and merge against the full frame. When a new
+export only differs in a few records, the index is updated from the removed
+and added rows instead of being rebuilt.
+
+The preparation-window model is an alternative to counting proposals in
+their deadline week: each proposal's load is spread evenly over the working
+days of the window before its deadline (20 working days by default), and the
+daily and weekly loads per analyst are summed with a difference array over
+working-day ordinals, with no per-day Python loop.
+"""
+import numpy as np
+import pandas as pd
+
+import business_days
+
+
+def build_workload_index(df, name_mapping):
+    """Return (counts, proposals) for a cleaned export.
+
+    counts is a DataFrame indexed by week start date with one int column per
+    analyst (sorted by first name). proposals maps (week, analyst) to a list of
+    "Record Number: Record Owner" strings.
+    """
+    analysts = sorted(set(name_mapping.values()))
+    mapped = df[df['PreAward Analyst'].isin(name_mapping.keys())]
+    if mapped.empty:
+        counts = pd.DataFrame(0, index=pd.Index([], name='WeekStart_date'), columns=analysts)
+        return counts, {}
+    first_names = mapped['PreAward Analyst'].map(name_mapping)
+    keys = [mapped['WeekStart_date'], first_names]
+    counts = (
+        mapped.groupby(keys)['Record Number'].size()
+        .unstack(fill_value=0)
+        .reindex(columns=analysts, fill_value=0)
+        .sort_index()
+        .astype(int)
+    )
+    counts.index.name = 'WeekStart_date'
+    counts.columns.name = None
+    labels = mapped['Record Number'].astype(str) + ": " + mapped['Record Owner'].astype(str)
+    proposals = labels.groupby(keys).agg(list).to_dict()
+    return counts, proposals
+
+
+def update_workload_index(counts, proposals, removed, added, name_mapping):
+    """Return (counts, proposals) with `removed` rows taken out and `added` rows put in.
+
+    A changed record is passed as its old row in removed and its new row in
+    added. Only the week/analyst cells those rows fall in are touched.
+    """
+    removed_counts, removed_proposals = build_workload_index(removed, name_mapping)
+    added_counts, added_proposals = build_workload_index(added, name_mapping)
+    counts = counts.add(added_counts, fill_value=0).sub(removed_counts, fill_value=0)
+    counts = counts[(counts != 0).any(axis=1)].sort_index().astype(int)
+    counts.index.name = 'WeekStart_date'
+
+    proposals = dict(proposals)
+    for cell, labels in removed_proposals.items():
+        remaining = list(proposals.get(cell, []))
+        for label in labels:
+            if label in remaining:
+                remaining.remove(label)
+        proposals[cell] = remaining
+    for cell, labels in added_proposals.items():
+        proposals[cell] = proposals.get(cell, []) + labels
+    proposals = {cell: labels for cell, labels in proposals.items() if labels}
+    return counts, proposals
+
+
+def _window_bounds(mapped, calendar, working_days):
+    """Origin working day and each row's [start, end) working-day ordinals."""
+    deadlines = mapped['Deadline Date'].to_numpy(dtype='datetime64[D]')
+    origin = business_days.subtract_working_days(deadlines.min(), working_days, calendar)
+    # Working days strictly before each deadline, counted from the origin.
+    end = np.busday_count(origin, deadlines, busdaycal=calendar)
+    return origin, end - working_days, end
+
+
+def daily_window_load(df, name_mapping, calendar, working_days=business_days.NOTIFICATION_WORKING_DAYS):
+    """Load per analyst on each working day, each proposal adding 1/working_days a day.
+
+    Returns a DataFrame indexed by working-day date with one float column per
+    analyst (sorted by first name).
+    """
+    analysts = sorted(set(name_mapping.values()))
+    mapped = df[df['PreAward Analyst'].isin(name_mapping.keys())]
+    if mapped.empty:
+        return pd.DataFrame(0.0, index=pd.Index([], name='Date'), columns=analysts)
+    origin, start, end = _window_bounds(mapped, calendar, working_days)
+    columns = pd.Index(analysts).get_indexer(mapped['PreAward Analyst'].map(name_mapping))
+    # Difference array: +share where a window opens, -share where it closes.
+    diff = np.zeros((end.max() + 1, len(analysts)))
+    np.add.at(diff, (start, columns), 1.0 / working_days)
+    np.add.at(diff, (end, columns), -1.0 / working_days)
+    daily = np.cumsum(diff, axis=0)[:-1]
+    dates = np.busday_offset(origin, np.arange(len(daily)), roll='forward', busdaycal=calendar)
+    return pd.DataFrame(daily.round(6), index=pd.Index(pd.to_datetime(dates).date, name='Date'), columns=analysts)
+
+
+def build_window_index(df, name_mapping, calendar, working_days=business_days.NOTIFICATION_WORKING_DAYS):
+    """Return (load, proposals) for the preparation-window model.
+
+    Same layout as build_workload_index, but load holds each analyst's summed
+    weekly share of proposal work and proposals lists every proposal whose
+    window overlaps the week.
+    """
+    daily = daily_window_load(df, name_mapping, calendar, working_days)
+    if daily.empty:
+        load = pd.DataFrame(0.0, index=pd.Index([], name='WeekStart_date'), columns=daily.columns)
+        return load, {}
+    days = pd.DatetimeIndex(daily.index)
+    weeks = (days - pd.to_timedelta(days.dayofweek, unit='D')).date
+    load = daily.groupby(weeks).sum().round(2)
+    load = load[(load != 0).any(axis=1)]
+    load.index.name = 'WeekStart_date'
+
+    # Expand each proposal to every week its window touches.
+    mapped = df[df['PreAward Analyst'].isin(name_mapping.keys())]
+    origin, start, end = _window_bounds(mapped, calendar, working_days)
+    first_day = pd.DatetimeIndex(np.busday_offset(origin, start, roll='forward', busdaycal=calendar))
+    last_day = pd.DatetimeIndex(np.busday_offset(origin, end - 1, roll='forward', busdaycal=calendar))
+    first_week = first_day - pd.to_timedelta(first_day.dayofweek, unit='D')
+    last_week = last_day - pd.to_timedelta(last_day.dayofweek, unit='D')
+    spans = ((last_week - first_week).days // 7 + 1).to_numpy()
+    rows = np.repeat(np.arange(len(mapped)), spans)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(spans) - spans, spans)
+    cell_weeks = (first_week[rows] + pd.to_timedelta(offsets * 7, unit='D')).date
+    labels = (mapped['Record Number'].astype(str) + ": " + mapped['Record Owner'].astype(str)
+              + " (due " + mapped['Deadline Date'].dt.strftime('%Y-%m-%d') + ")").to_numpy()[rows]
+    first_names = mapped['PreAward Analyst'].map(name_mapping).to_numpy()[rows]
+    proposals = pd.Series(labels).groupby([cell_weeks, first_names]).agg(list).to_dict()
+    return load, proposals
+
+
+def week_counts(counts, week):
+    """Counts per analyst for one week start; all zeros when the week is empty."""
+    if week in counts.index:
+        return counts.loc[week]
+    return pd.Series(0, index=counts.columns, name=week)
+
+
+def weeks_slice(counts, weeks):
+    """Count matrix restricted to the given week starts, filling empty weeks."""
+    return counts.reindex(weeks, fill_value=0)
+
+
+def hover_text(proposals, week, analyst):
+    """Hover text listing the proposals for one week/analyst cell."""
+    items = proposals.get((week, analyst), [])
+    return "<br>".join(items) if items else "No proposals"
+
+
+def count_colors(counts):
+    """Color name per count: green up to 2, yellow up to 3, red above."""
+    counts = np.asarray(counts)
+    return np.select([counts <= 2, counts <= 3], ['green', 'yellow'], default='red')
@@ -0,0 +1,108 @@
+"""Shared store for custom workload levels.
+
+Entries are kept in SQLite (WAL mode) with one row per (analyst, week start),
+so each form submit is a single atomic upsert and concurrent submits from
+different sessions cannot overwrite each other. A process loads the table
+once and afterwards only reads rows whose sequence number is newer than the
+last one it saw. The legacy custom_workload.json file is imported the first
+time the database is created.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+DB_PATH = "custom_workload.db"
+LEGACY_JSON = "custom_workload.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS custom_workload (
+    analyst TEXT NOT NULL,
+    week TEXT NOT NULL,
+    percentage INTEGER NOT NULL,
+    reasoning TEXT NOT NULL DEFAULT '',
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (analyst, week)
+);
+CREATE INDEX IF NOT EXISTS custom_workload_week ON custom_workload (week);
+CREATE INDEX IF NOT EXISTS custom_workload_seq ON custom_workload (seq);
+"""
+
+_UPSERT = """
+INSERT INTO custom_workload (analyst, week, percentage, reasoning, seq)
+VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM custom_workload))
+ON CONFLICT (analyst, week) DO UPDATE SET
+    percentage = excluded.percentage,
+    reasoning = excluded.reasoning,
+    seq = excluded.seq
+"""
+
+
+class CustomWorkloadStore:
+    """Custom workload levels keyed by (analyst first name, week start string)."""
+
+    def __init__(self, path=DB_PATH, legacy_json=LEGACY_JSON):
+        self._lock = threading.Lock()
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._import_legacy_json(legacy_json)
+        self._entries = {}
+        self._data_version = None
+        self.version = 0
+        self.refresh()
+
+    def _import_legacy_json(self, legacy_json):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # user_version marks that the one-time import has already run.
+                if self._conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+                    if legacy_json and os.path.exists(legacy_json):
+                        with open(legacy_json, "r") as f:
+                            data = json.load(f)
+                        for key_str, value in data.items():
+                            # The key is stored as "Analyst|WeekStart" (e.g., "Tyler|2025-01-06")
+                            analyst, week = key_str.split("|")
+                            self._conn.execute(_UPSERT, (analyst, week, value.get("percentage", 100),
+                                                         value.get("reasoning", "")))
+                    self._conn.execute("PRAGMA user_version = 1")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _load_changes(self):
+        rows = self._conn.execute(
+            "SELECT analyst, week, percentage, reasoning, seq FROM custom_workload WHERE seq > ? ORDER BY seq",
+            (self.version,)
+        ).fetchall()
+        for analyst, week, percentage, reasoning, seq in rows:
+            self._entries[(analyst, week)] = {"percentage": percentage, "reasoning": reasoning}
+            self.version = seq
+
+    def refresh(self):
+        """Pick up rows committed by other processes since the last refresh."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._load_changes()
+                self._data_version = data_version
+
+    def get(self, analyst, week):
+        """Entry for one analyst and week start, or None when none was set."""
+        return self._entries.get((analyst, str(week)))
+
+    def upsert(self, analyst, week, percentage, reasoning):
+        """Atomically set the workload level for one analyst and week start."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(_UPSERT, (analyst, str(week), percentage, reasoning))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._load_changes()